@@ -1,23 +1,72 @@
 import cv2
 import numpy as np
 import streamlit as st
-from typing import Dict, Optional
-from pose_utils import PoseDetector
-from exercise_analyzer import ExerciseAnalyzer, create_analyzer
+from typing import Dict, List, Optional, Tuple
+from pose_utils import PoseDetector, TextOverlayCache, resize_for_inference
+from exercise_analyzer import ExerciseAnalyzer, ExerciseState, create_analyzer
+import math
+import queue
 import threading
 import time
+import warnings
+from collections import deque
+
+# Longest side, in pixels, of the frame handed to the pose model
+INFERENCE_MAX_SIDE = 256
+
+# Run pose inference on every Nth captured frame; frames in between reuse the last analysis
+ANALYSIS_STRIDE = 3
+
+# Frames older than this, in seconds, when inference gets to them are dropped instead of analyzed
+MAX_FRAME_AGE = 0.1
+
+# BlazePose lite (0) is roughly twice as fast on CPU as the default full model (1)
+LIVE_MODEL_COMPLEXITY = 0
+
+# Reuse the last pose results while the scene changes less than this (mean grayscale difference)
+LIVE_CACHE_SENSITIVITY = 2.0
+
+# Number of distinct rasterized HUD text lines kept for reuse
+HUD_CACHE_SIZE = 256
+
+# Capture settings that keep live latency low: (property, value, description)
+LOW_LATENCY_SETTINGS = (
+    (cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'), "MJPG capture format"),
+    (cv2.CAP_PROP_BUFFERSIZE, 1, "a single-frame capture buffer"),
+)
 
 class CameraAnalyzer:
     """Real-time camera analysis for live exercise tracking"""
     
-    def __init__(self):
-        self.pose_detector = PoseDetector()
+    def __init__(self, analysis_stride: int = ANALYSIS_STRIDE):
+        try:
+            self.pose_detector = PoseDetector(model_complexity=LIVE_MODEL_COMPLEXITY,
+                                              cache_sensitivity=LIVE_CACHE_SENSITIVITY)
+        except OSError as e:
+            # MediaPipe only bundles the full model and downloads the lite one on first use
+            warnings.warn(f"Could not load the lite pose model ({e}); using the full model for live analysis")
+            self.pose_detector = PoseDetector(cache_sensitivity=LIVE_CACHE_SENSITIVITY)
         self.analyzer = None
+        self.analysis_stride = max(1, analysis_stride)
         self.cap = None
+        self.capture_thread = None
+        self.inference_thread = None
         self.is_running = False
-        self.current_frame = None
-        self.current_analysis = None
+        # (capture time, frame) waiting for pose inference; holds one so inference always gets the newest frame
+        self.inference_queue = queue.Queue(maxsize=1)
+        # Frames that never reached inference because a newer one replaced them or they went stale
+        self.dropped_frames = 0
+        # Newest (analysis, pose_results) from the inference thread, paired with each captured frame
+        self.latest_analysis = None
+        # Only the newest (frame, analysis, pose_results) is kept; stale frames are dropped
+        self.latest_frame = deque(maxlen=1)
         self.frame_lock = threading.Lock()
+        # Set by the capture thread whenever a new analyzed frame is available
+        self.frame_ready = threading.Event()
+        # Bumped for every published frame so readers can tell a new frame from one already shown
+        self.frame_seq = 0
+        # HUD text is rasterized once per distinct text and stamped onto later frames
+        self._hud = TextOverlayCache(HUD_CACHE_SIZE)
         
     def set_exercise_analyzer(self, analyzer: ExerciseAnalyzer):
         """Set the exercise analyzer for real-time analysis"""
@@ -26,7 +75,21 @@ class CameraAnalyzer:
             self.analyzer.reset()
     
     def start_camera(self, camera_index: int = 0):
-        """Start the camera capture"""
+        """Start the camera capture, beginning a fresh session on a reused analyzer; a no-op while running"""
+        # A second set of threads would drive the same MediaPipe graph concurrently
+        if self.is_running:
+            return
+        # Neither rep counts nor tracking, smoothing and cached landmarks carry over from the last stream
+        if self.analyzer:
+            self.analyzer.reset()
+        self.pose_detector.reset()
+        self.latest_frame.clear()
+        self.latest_analysis = None
+        self.frame_ready.clear()
+        while not self.inference_queue.empty():
+            self.inference_queue.get_nowait()
+        self.dropped_frames = 0
+        
         self.cap = cv2.VideoCapture(camera_index)
         if not self.cap.isOpened():
             raise ValueError(f"Could not open camera at index {camera_index}")
@@ -36,46 +99,97 @@ class CameraAnalyzer:
         self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
         self.cap.set(cv2.CAP_PROP_FPS, 30)
         
+        # MJPG halves USB bandwidth on most UVC cameras, and a one-frame driver
+        # buffer stops stale frames queueing up ahead of the pipeline
+        for prop, value, description in LOW_LATENCY_SETTINGS:
+            if not self.cap.set(prop, value):
+                warnings.warn(f"Camera did not accept {description}; live feed latency may be higher")
+        
         self.is_running = True
         
-        # Start frame capture thread
+        # Capture and pose inference run on separate threads so a slow model never stalls the feed
+        self.inference_thread = threading.Thread(target=self._analyze_frames, daemon=True)
+        self.inference_thread.start()
         self.capture_thread = threading.Thread(target=self._capture_frames, daemon=True)
         self.capture_thread.start()
     
     def _capture_frames(self):
         """Background thread for continuous frame capture"""
+        frame_index = 0
         while self.is_running:
             if self.cap and self.cap.isOpened():
                 ret, frame = self.cap.read()
                 if ret:
+                    # Hand every analysis_stride-th frame to inference; the feed still shows every frame
+                    if frame_index % self.analysis_stride == 0:
+                        self._queue_for_inference(time.monotonic(), frame)
+                    frame_index += 1
                     with self.frame_lock:
-                        self.current_frame = frame.copy()
-                        # Process frame for analysis
-                        analysis, pose_results = self.process_frame(frame)
-                        self.current_analysis = analysis
-                        self.current_pose_results = pose_results
-            time.sleep(0.033)  # ~30 FPS
+                        # Nothing to show until the first frame has been analyzed
+                        if self.latest_analysis is None:
+                            continue
+                        analysis, pose_results = self.latest_analysis
+                        self.frame_seq += 1
+                        self.latest_frame.append((frame, analysis, pose_results))
+                    self.frame_ready.set()
+                    # cap.read() already blocks until the driver delivers the next frame
+                    continue
+            # Back off briefly when the device is closed or a read fails instead of spinning
+            time.sleep(0.01)
+    
+    def _queue_for_inference(self, captured_at: float, frame: np.ndarray):
+        """Replace any frame still waiting for inference with this one"""
+        try:
+            self.inference_queue.get_nowait()
+            with self.frame_lock:
+                self.dropped_frames += 1
+        except queue.Empty:
+            pass
+        # The capture thread is the only producer, so the slot is free now
+        self.inference_queue.put_nowait((captured_at, frame))
+    
+    def _analyze_frames(self):
+        """Background thread running pose inference on the newest captured frame"""
+        while self.is_running:
+            try:
+                captured_at, frame = self.inference_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            # After a stall, skip the backlog rather than counting reps from old motion
+            if time.monotonic() - captured_at > MAX_FRAME_AGE:
+                with self.frame_lock:
+                    self.dropped_frames += 1
+                continue
+            analysis, pose_results = self.process_frame(frame)
+            with self.frame_lock:
+                self.latest_analysis = (analysis, pose_results)
     
     def stop_camera(self):
         """Stop the camera capture"""
         self.is_running = False
+        # Let both threads finish their current frame before releasing the device
+        for thread in (self.capture_thread, self.inference_thread):
+            if thread and thread is not threading.current_thread():
+                thread.join(timeout=1.0)
         if self.cap:
             self.cap.release()
+        # Wake anyone waiting on a frame that will never arrive
+        self.frame_ready.set()
     
     def process_frame(self, frame: np.ndarray):
         """Process a single frame and return analysis results and pose results"""
         if not self.is_running or frame is None:
-            return {"rep_count": 0, "state": "unknown", "angles": {}, "feedback": []}, None
+            return {"rep_count": 0, "state": ExerciseState.UNKNOWN, "angles": {}, "feedback": []}, None
         
-        # Detect pose
-        pose_results = self.pose_detector.detect_pose(frame)
+        # Detect pose on a downscaled copy; the full-res frame is kept for drawing
+        pose_results = self.pose_detector.detect_pose(resize_for_inference(frame, INFERENCE_MAX_SIDE))
         landmarks = self.pose_detector.get_landmarks(pose_results)
         
         # Analyze exercise
         if self.analyzer:
             analysis = self.analyzer.analyze_frame(landmarks)
         else:
-            analysis = {"rep_count": 0, "state": "unknown", "angles": {}, "feedback": []}
+            analysis = {"rep_count": 0, "state": ExerciseState.UNKNOWN, "angles": {}, "feedback": []}
         
         return analysis, pose_results
     
@@ -85,35 +199,34 @@ class CameraAnalyzer:
         
         # Draw pose landmarks (if pose detected)
         if pose_results:
-            annotated_frame = self.pose_detector.draw_pose(annotated_frame, pose_results)
-        
-        # Draw analysis information
-        # Rep counter
-        rep_text = f"Reps: {analysis['rep_count']}"
-        cv2.putText(annotated_frame, rep_text, (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+            annotated_frame = self.pose_detector.draw_pose(annotated_frame, pose_results, copy=False)
         
-        # Current state
-        state_text = f"State: {analysis['state'].upper()}"
-        cv2.putText(annotated_frame, state_text, (10, 70), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-        
-        # Draw angles
-        y_offset = 110
-        for angle_name, angle_value in analysis['angles'].items():
-            angle_text = f"{angle_name}: {angle_value:.1f}°"
-            cv2.putText(annotated_frame, angle_text, (10, y_offset), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            y_offset += 30
+        # Draw analysis information from the cached HUD pixels instead of rasterizing text every frame
+        self._hud.draw(annotated_frame, self._hud_lines(analysis))
         
         return annotated_frame
     
+    def _hud_lines(self, analysis: Dict) -> List[Tuple[str, Tuple[int, int], float, Tuple[int, int, int], int]]:
+        """(text, origin, font scale, color, thickness) for the rep counter, state and each angle"""
+        lines = [
+            (f"Reps: {analysis['rep_count']}", (10, 30), 1, (0, 255, 0), 2),
+            (f"State: {analysis['state'].name}", (10, 70), 0.7, (255, 255, 0), 2),
+        ]
+        # Undefined (NaN) angles are left out rather than drawn as "nan°"
+        measured = [(name, value) for name, value in analysis['angles'].items() if not math.isnan(value)]
+        for i, (angle_name, angle_value) in enumerate(measured):
+            lines.append((f"{angle_name}: {angle_value:.1f}°", (10, 110 + 30 * i), 0.6, (255, 255, 255), 2))
+        return lines
+    
     def get_current_frame_and_analysis(self):
-        """Get the current frame, analysis, and pose results with thread safety"""
+        """Get the newest frame, analysis, pose results, and frame sequence number with thread safety"""
         with self.frame_lock:
-            if self.current_frame is not None:
-                return self.current_frame.copy(), self.current_analysis, getattr(self, 'current_pose_results', None)
-        return None, None, None
+            if self.latest_frame:
+                # cap.read() hands back a new array per frame and nothing writes to it after
+                # publishing, so the frame can be shared; draw_analysis_on_frame draws on a copy
+                frame, analysis, pose_results = self.latest_frame[-1]
+                return frame, analysis, pose_results, self.frame_seq
+            return None, None, None, self.frame_seq
     
     def get_frame(self):
         """Get a frame from the camera (legacy method)"""
@@ -1,19 +1,32 @@
+import math
 import numpy as np
+from collections import deque
+from dataclasses import dataclass
+from enum import IntEnum
 from typing import Dict, List, Tuple, Optional
-from pose_utils import PoseLandmarks, calculate_angle, get_landmark_coordinates, is_landmark_visible
+from pose_utils import PoseLandmarks, calculate_angles, is_landmark_visible
 
-class ExerciseState:
+# Frames of state, angle and feedback history kept per analyzer (20 s at 30 FPS)
+HISTORY_LENGTH = 600
+
+# Landmark visibility at or below which a joint is treated as occluded
+VISIBILITY_THRESHOLD = 0.5
+
+class ExerciseState(IntEnum):
     """Exercise state enumeration"""
-    UP = "up"
-    DOWN = "down"
-    TRANSITION = "transition"
+    UNKNOWN = -1
+    UP = 0
+    DOWN = 1
+    TRANSITION = 2
 
+# No slots=True: it needs Python 3.10 and setup.py still supports 3.8; the analyzers share a
+# handful of instances, so a per-instance __dict__ costs nothing measurable
+@dataclass(frozen=True)
 class FormFeedback:
     """Form feedback data structure"""
-    def __init__(self, is_correct: bool, message: str, severity: str = "info"):
-        self.is_correct = is_correct
-        self.message = message
-        self.severity = severity  # "info", "warning", "error"
+    is_correct: bool
+    message: str
+    severity: str = "info"  # "info", "warning", "error"
 
 class ExerciseAnalyzer:
     """Base class for exercise analysis"""
@@ -21,34 +34,93 @@ class ExerciseAnalyzer:
     def __init__(self):
         self.rep_count = 0
         self.current_state = ExerciseState.UP
-        self.state_history = []
-        self.angle_history = []
-        self.feedback_history = []
+        # Bounded so long sessions and videos do not pin every frame's results in memory
+        self.state_history = deque(maxlen=HISTORY_LENGTH)
+        self.angle_history = deque(maxlen=HISTORY_LENGTH)
+        self.feedback_history = deque(maxlen=HISTORY_LENGTH)
         
     def analyze_frame(self, landmarks) -> Dict:
         """Analyze a single frame and return results"""
         raise NotImplementedError
         
-    def get_form_feedback(self, landmarks) -> List[FormFeedback]:
-        """Get form feedback for current frame"""
+    def get_form_feedback(self, landmarks, angles: Optional[Dict[str, float]] = None) -> List[FormFeedback]:
+        """Get form feedback for current frame, reusing already computed angles when given"""
         raise NotImplementedError
         
+    def analyze_sequence(self, landmarks_sequence: np.ndarray) -> Dict:
+        """
+        Analyze a whole sequence of detected poses in one vectorized pass.
+        
+        Independent of the analyzer's running state: the result equals feeding every frame
+        to analyze_frame on a freshly reset analyzer.
+        
+        Args:
+            landmarks_sequence: Array of shape (T, 33, 4), one landmark array per frame
+        
+        Returns:
+            Dict with per-frame "angles" (T, n) in ANGLE_NAMES order, per-frame "states" and the "rep_count"
+        """
+        angles = calculate_angles(landmarks_sequence, self.ANGLE_JOINTS)
+        state_index = self.ANGLE_NAMES.index(self.STATE_ANGLE)
+        states = np.where(angles[:, state_index] < self.state_threshold, ExerciseState.DOWN, ExerciseState.UP).astype(np.int8)
+        
+        # Carry the last measurable frame's state over occluded or degenerate frames, starting from UP like a reset analyzer
+        visible = np.all(np.asarray(landmarks_sequence)[:, self.ANGLE_JOINTS[state_index], 3] > VISIBILITY_THRESHOLD, axis=1)
+        visible &= ~np.isnan(angles[:, state_index])
+        last_visible = np.maximum.accumulate(np.where(visible, np.arange(len(states)), -1))
+        states = np.where(last_visible >= 0, states[np.maximum(last_visible, 0)], ExerciseState.UP).astype(np.int8)
+        
+        # A rep is DOWN followed by UP; like _is_rep_complete, transitions before the third frame do not count
+        rep_count = int(np.count_nonzero((states[1:-1] == ExerciseState.DOWN) & (states[2:] == ExerciseState.UP)))
+        
+        return {"rep_count": rep_count, "states": states, "angles": angles}
+        
+    def _state_joints_visible(self, landmarks) -> bool:
+        """Whether every joint of STATE_ANGLE is confidently detected in this frame"""
+        joints = self.ANGLE_JOINTS[self.ANGLE_NAMES.index(self.STATE_ANGLE)]
+        return all(is_landmark_visible(landmarks, joint, VISIBILITY_THRESHOLD) for joint in joints)
+        
+    def _state_measurable(self, landmarks, angles: Dict[str, float]) -> bool:
+        """Whether STATE_ANGLE can decide the state: its joints are visible and the angle is defined"""
+        return self._state_joints_visible(landmarks) and not math.isnan(angles[self.STATE_ANGLE])
+        
     def reset(self):
         """Reset analyzer state"""
         self.rep_count = 0
         self.current_state = ExerciseState.UP
-        self.state_history = []
-        self.angle_history = []
-        self.feedback_history = []
+        self.state_history.clear()
+        self.angle_history.clear()
+        self.feedback_history.clear()
 
 class PushUpAnalyzer(ExerciseAnalyzer):
     """Push-up exercise analyzer"""
     
+    # Right side is primary: (first point, vertex, third point) for each measured angle
+    ANGLE_NAMES = ('elbow', 'shoulder', 'body_alignment')
+    ANGLE_JOINTS = np.array([
+        (PoseLandmarks.RIGHT_SHOULDER, PoseLandmarks.RIGHT_ELBOW, PoseLandmarks.RIGHT_WRIST),
+        (PoseLandmarks.RIGHT_ELBOW, PoseLandmarks.RIGHT_SHOULDER, PoseLandmarks.RIGHT_HIP),
+        # Body alignment (shoulder to hip to knee)
+        (PoseLandmarks.RIGHT_SHOULDER, PoseLandmarks.RIGHT_HIP, PoseLandmarks.RIGHT_KNEE),
+    ])
+    # The angle that decides between UP and DOWN
+    STATE_ANGLE = 'elbow'
+    
+    # FormFeedback is immutable, so each message is built once and shared by every frame
+    FEEDBACK_DEPTH = FormFeedback(False, "Go deeper - elbows should bend past 90 degrees", "warning")
+    FEEDBACK_ELBOWS = FormFeedback(False, "Keep elbows closer to body - don't flare them out", "warning")
+    FEEDBACK_BODY = FormFeedback(False, "Keep body straight - avoid hip sagging", "error")
+    
     def __init__(self):
         super().__init__()
         self.elbow_angle_threshold = 90  # degrees
         self.shoulder_angle_threshold = 45  # degrees
         self.hip_angle_threshold = 160  # degrees
+    
+    @property
+    def state_threshold(self) -> float:
+        """STATE_ANGLE below this many degrees is DOWN"""
+        return self.elbow_angle_threshold
         
     def analyze_frame(self, landmarks) -> Dict:
         """Analyze push-up form and count reps"""
@@ -58,8 +130,12 @@ class PushUpAnalyzer(ExerciseAnalyzer):
         # Calculate key angles
         angles = self._calculate_angles(landmarks)
         
-        # Determine state
-        new_state = self._determine_state(angles)
+        # Determine state, holding the last one while its joints are occluded or the angle is undefined,
+        # so guessed angles never count reps
+        if self._state_measurable(landmarks, angles):
+            new_state = self._determine_state(angles)
+        else:
+            new_state = self.current_state
         
         # Count reps
         if self._is_rep_complete(new_state):
@@ -69,8 +145,8 @@ class PushUpAnalyzer(ExerciseAnalyzer):
         self.state_history.append(new_state)
         self.angle_history.append(angles)
         
-        # Get form feedback
-        feedback = self.get_form_feedback(landmarks)
+        # Get form feedback from the angles already computed for this frame
+        feedback = self.get_form_feedback(landmarks, angles)
         self.feedback_history.append(feedback)
         
         return {
@@ -81,38 +157,19 @@ class PushUpAnalyzer(ExerciseAnalyzer):
         }
     
     def _calculate_angles(self, landmarks) -> Dict[str, float]:
-        """Calculate key angles for push-up analysis"""
-        angles = {}
-        
-        # Right arm angles (assuming right arm is primary)
-        right_shoulder = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_SHOULDER)
-        right_elbow = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_ELBOW)
-        right_wrist = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_WRIST)
-        right_hip = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_HIP)
-        
-        if right_shoulder is not None and right_elbow is not None and right_wrist is not None:
-            angles['elbow'] = calculate_angle(right_shoulder, right_elbow, right_wrist)
-        
-        if right_elbow is not None and right_shoulder is not None and right_hip is not None:
-            angles['shoulder'] = calculate_angle(right_elbow, right_shoulder, right_hip)
-        
-        # Body alignment (shoulder to hip to knee)
-        right_knee = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_KNEE)
-        if right_shoulder is not None and right_hip is not None and right_knee is not None:
-            angles['body_alignment'] = calculate_angle(right_shoulder, right_hip, right_knee)
-        
-        return angles
+        """Calculate key angles for push-up analysis; every name in ANGLE_NAMES is always present"""
+        return dict(zip(self.ANGLE_NAMES, calculate_angles(landmarks, self.ANGLE_JOINTS).tolist()))
     
-    def _determine_state(self, angles: Dict[str, float]) -> str:
+    def _determine_state(self, angles: Dict[str, float]) -> ExerciseState:
         """Determine current exercise state based on angles"""
-        elbow_angle = angles.get('elbow', 180)
+        elbow_angle = angles['elbow']
         
         if elbow_angle < self.elbow_angle_threshold:
             return ExerciseState.DOWN
         else:
             return ExerciseState.UP
     
-    def _is_rep_complete(self, new_state: str) -> bool:
+    def _is_rep_complete(self, new_state: ExerciseState) -> bool:
         """Check if a complete rep has been performed"""
         if len(self.state_history) < 2:
             return False
@@ -123,52 +180,62 @@ class PushUpAnalyzer(ExerciseAnalyzer):
             return True
         return False
     
-    def get_form_feedback(self, landmarks) -> List[FormFeedback]:
+    def get_form_feedback(self, landmarks, angles: Optional[Dict[str, float]] = None) -> List[FormFeedback]:
         """Get form feedback for push-up"""
         feedback = []
         
         if landmarks is None:
             return feedback
             
-        angles = self._calculate_angles(landmarks)
+        if angles is None:
+            angles = self._calculate_angles(landmarks)
         
         # Check elbow angle
-        elbow_angle = angles.get('elbow', 180)
+        elbow_angle = angles['elbow']
         if self.current_state == ExerciseState.DOWN and elbow_angle > 100:
-            feedback.append(FormFeedback(
-                is_correct=False,
-                message="Go deeper - elbows should bend past 90 degrees",
-                severity="warning"
-            ))
+            feedback.append(self.FEEDBACK_DEPTH)
         
         # Check shoulder angle (elbow position)
-        shoulder_angle = angles.get('shoulder', 90)
+        shoulder_angle = angles['shoulder']
         if shoulder_angle > 90:
-            feedback.append(FormFeedback(
-                is_correct=False,
-                message="Keep elbows closer to body - don't flare them out",
-                severity="warning"
-            ))
+            feedback.append(self.FEEDBACK_ELBOWS)
         
         # Check body alignment
-        body_angle = angles.get('body_alignment', 180)
+        body_angle = angles['body_alignment']
         if body_angle < 160:
-            feedback.append(FormFeedback(
-                is_correct=False,
-                message="Keep body straight - avoid hip sagging",
-                severity="error"
-            ))
+            feedback.append(self.FEEDBACK_BODY)
         
         return feedback
 
 class SquatAnalyzer(ExerciseAnalyzer):
     """Squat exercise analyzer"""
     
+    # Right leg: (first point, vertex, third point) for each measured angle
+    ANGLE_NAMES = ('knee', 'hip', 'ankle')
+    ANGLE_JOINTS = np.array([
+        (PoseLandmarks.RIGHT_HIP, PoseLandmarks.RIGHT_KNEE, PoseLandmarks.RIGHT_ANKLE),
+        (PoseLandmarks.RIGHT_SHOULDER, PoseLandmarks.RIGHT_HIP, PoseLandmarks.RIGHT_KNEE),
+        # Ankle angle (for heel position check)
+        (PoseLandmarks.RIGHT_KNEE, PoseLandmarks.RIGHT_ANKLE, PoseLandmarks.RIGHT_FOOT_INDEX),
+    ])
+    # The angle that decides between UP and DOWN
+    STATE_ANGLE = 'knee'
+    
+    # FormFeedback is immutable, so each message is built once and shared by every frame
+    FEEDBACK_DEPTH = FormFeedback(False, "Go deeper - thighs should be parallel to ground", "warning")
+    FEEDBACK_CHEST = FormFeedback(False, "Keep chest up - maintain proud posture", "warning")
+    FEEDBACK_HEELS = FormFeedback(False, "Keep heels on the ground", "error")
+    
     def __init__(self):
         super().__init__()
         self.knee_angle_threshold = 110  # degrees (parallel to ground)
         self.hip_angle_threshold = 45  # degrees
         self.ankle_angle_threshold = 70  # degrees
+    
+    @property
+    def state_threshold(self) -> float:
+        """STATE_ANGLE below this many degrees is DOWN"""
+        return self.knee_angle_threshold
         
     def analyze_frame(self, landmarks) -> Dict:
         """Analyze squat form and count reps"""
@@ -178,8 +245,12 @@ class SquatAnalyzer(ExerciseAnalyzer):
         # Calculate key angles
         angles = self._calculate_angles(landmarks)
         
-        # Determine state
-        new_state = self._determine_state(angles)
+        # Determine state, holding the last one while its joints are occluded or the angle is undefined,
+        # so guessed angles never count reps
+        if self._state_measurable(landmarks, angles):
+            new_state = self._determine_state(angles)
+        else:
+            new_state = self.current_state
         
         # Count reps
         if self._is_rep_complete(new_state):
@@ -189,8 +260,8 @@ class SquatAnalyzer(ExerciseAnalyzer):
         self.state_history.append(new_state)
         self.angle_history.append(angles)
         
-        # Get form feedback
-        feedback = self.get_form_feedback(landmarks)
+        # Get form feedback from the angles already computed for this frame
+        feedback = self.get_form_feedback(landmarks, angles)
         self.feedback_history.append(feedback)
         
         return {
@@ -201,38 +272,19 @@ class SquatAnalyzer(ExerciseAnalyzer):
         }
     
     def _calculate_angles(self, landmarks) -> Dict[str, float]:
-        """Calculate key angles for squat analysis"""
-        angles = {}
-        
-        # Right leg angles
-        right_hip = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_HIP)
-        right_knee = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_KNEE)
-        right_ankle = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_ANKLE)
-        right_shoulder = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_SHOULDER)
-        
-        if right_hip is not None and right_knee is not None and right_ankle is not None:
-            angles['knee'] = calculate_angle(right_hip, right_knee, right_ankle)
-        
-        if right_shoulder is not None and right_hip is not None and right_knee is not None:
-            angles['hip'] = calculate_angle(right_shoulder, right_hip, right_knee)
-        
-        # Ankle angle (for heel position check)
-        right_foot = get_landmark_coordinates(landmarks, PoseLandmarks.RIGHT_FOOT_INDEX)
-        if right_knee is not None and right_ankle is not None and right_foot is not None:
-            angles['ankle'] = calculate_angle(right_knee, right_ankle, right_foot)
-        
-        return angles
+        """Calculate key angles for squat analysis; every name in ANGLE_NAMES is always present"""
+        return dict(zip(self.ANGLE_NAMES, calculate_angles(landmarks, self.ANGLE_JOINTS).tolist()))
     
-    def _determine_state(self, angles: Dict[str, float]) -> str:
+    def _determine_state(self, angles: Dict[str, float]) -> ExerciseState:
         """Determine current exercise state based on angles"""
-        knee_angle = angles.get('knee', 180)
+        knee_angle = angles['knee']
         
         if knee_angle < self.knee_angle_threshold:
             return ExerciseState.DOWN
         else:
             return ExerciseState.UP
     
-    def _is_rep_complete(self, new_state: str) -> bool:
+    def _is_rep_complete(self, new_state: ExerciseState) -> bool:
         """Check if a complete rep has been performed"""
         if len(self.state_history) < 2:
             return False
@@ -243,49 +295,45 @@ class SquatAnalyzer(ExerciseAnalyzer):
             return True
         return False
     
-    def get_form_feedback(self, landmarks) -> List[FormFeedback]:
+    def get_form_feedback(self, landmarks, angles: Optional[Dict[str, float]] = None) -> List[FormFeedback]:
         """Get form feedback for squat"""
         feedback = []
         
         if landmarks is None:
             return feedback
             
-        angles = self._calculate_angles(landmarks)
+        if angles is None:
+            angles = self._calculate_angles(landmarks)
         
         # Check squat depth
-        knee_angle = angles.get('knee', 180)
+        knee_angle = angles['knee']
         if self.current_state == ExerciseState.DOWN and knee_angle > 120:
-            feedback.append(FormFeedback(
-                is_correct=False,
-                message="Go deeper - thighs should be parallel to ground",
-                severity="warning"
-            ))
+            feedback.append(self.FEEDBACK_DEPTH)
         
         # Check hip angle (back position)
-        hip_angle = angles.get('hip', 180)
+        hip_angle = angles['hip']
         if hip_angle < 45:
-            feedback.append(FormFeedback(
-                is_correct=False,
-                message="Keep chest up - maintain proud posture",
-                severity="warning"
-            ))
+            feedback.append(self.FEEDBACK_CHEST)
         
         # Check ankle angle (heel position)
-        ankle_angle = angles.get('ankle', 90)
+        ankle_angle = angles['ankle']
         if ankle_angle < 60:
-            feedback.append(FormFeedback(
-                is_correct=False,
-                message="Keep heels on the ground",
-                severity="error"
-            ))
+            feedback.append(self.FEEDBACK_HEELS)
         
         return feedback
 
+# Normalized exercise name -> analyzer class
+ANALYZERS = {
+    "pushup": PushUpAnalyzer,
+    "pushups": PushUpAnalyzer,
+    "push-ups": PushUpAnalyzer,
+    "squat": SquatAnalyzer,
+    "squats": SquatAnalyzer,
+}
+
 def create_analyzer(exercise_type: str) -> ExerciseAnalyzer:
     """Factory function to create appropriate exercise analyzer"""
-    if exercise_type.lower() == "pushup" or exercise_type.lower() == "push-ups":
-        return PushUpAnalyzer()
-    elif exercise_type.lower() == "squat" or exercise_type.lower() == "squats":
-        return SquatAnalyzer()
-    else:
-        raise ValueError(f"Unsupported exercise type: {exercise_type}") 
\ No newline at end of file
+    analyzer_class = ANALYZERS.get(exercise_type.lower().strip())
+    if analyzer_class is None:
+        raise ValueError(f"Unsupported exercise type: {exercise_type}")
+    return analyzer_class() 
\ No newline at end of file
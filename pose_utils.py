@@ -1,7 +1,10 @@
 import cv2
+import math
 import mediapipe as mp
 import numpy as np
-from typing import List, Tuple, Optional
+import threading
+from collections import OrderedDict
+from typing import List, Sequence, Tuple, Optional
 
 class PoseDetector:
     """Core pose detection and landmark extraction class"""
@@ -13,7 +16,8 @@ class PoseDetector:
                  enable_segmentation=False,
                  smooth_segmentation=True,
                  min_detection_confidence=0.5,
-                 min_tracking_confidence=0.5):
+                 min_tracking_confidence=0.5,
+                 cache_sensitivity=0.0):
         
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(
@@ -27,33 +31,123 @@ class PoseDetector:
         )
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
+        # Built once instead of on every draw_pose call
+        self.landmark_style = self.mp_drawing_styles.get_default_pose_landmarks_style()
+        # RGB conversion target reused across frames of the same size; MediaPipe copies its input
+        self._rgb_buffer = None
+        # Mean absolute difference (0-255) on a 64x64 grayscale thumbnail below which the previous
+        # results are reused instead of running the model; 0 disables the cache
+        self.cache_sensitivity = cache_sensitivity
+        self._last_thumbnail = None
+        self._last_results = None
     
     def detect_pose(self, image):
-        """Detect pose landmarks in an image"""
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        """Detect pose landmarks in an image, reusing the last results if it barely changed"""
+        if self.cache_sensitivity > 0:
+            thumbnail = cv2.resize(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), (64, 64), interpolation=cv2.INTER_AREA)
+            # Compared against the last frame the model actually saw, so slow motion still adds up
+            if (self._last_thumbnail is not None and
+                    cv2.absdiff(thumbnail, self._last_thumbnail).mean() < self.cache_sensitivity):
+                return self._last_results
+            self._last_thumbnail = thumbnail
+        
+        if self._rgb_buffer is None or self._rgb_buffer.shape != image.shape:
+            self._rgb_buffer = np.empty_like(image)
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
         results = self.pose.process(image_rgb)
+        self._last_results = results
         return results
     
+    def reset(self):
+        """Forget tracking, smoothing and cached results, e.g. before a frame that does not follow the last one"""
+        self.pose.reset()
+        self._last_thumbnail = None
+        self._last_results = None
+    
     def get_landmarks(self, results):
-        """Extract landmarks from pose detection results"""
+        """Extract landmarks from pose detection results as a contiguous (33, 4) float32 array of x, y, z, visibility"""
         if results.pose_landmarks:
-            landmarks = []
-            for landmark in results.pose_landmarks.landmark:
-                landmarks.append([landmark.x, landmark.y, landmark.z, landmark.visibility])
-            return np.array(landmarks)
+            # MediaPipe stores landmarks as float32, so the narrower dtype loses nothing
+            return np.array(
+                [(landmark.x, landmark.y, landmark.z, landmark.visibility)
+                 for landmark in results.pose_landmarks.landmark],
+                dtype=np.float32,
+            )
         return None
     
-    def draw_pose(self, image, results):
-        """Draw pose landmarks and connections on image"""
-        annotated_image = image.copy()
+    def draw_pose(self, image, results, copy: bool = True):
+        """Draw pose landmarks and connections on image, or directly onto it when copy is False"""
+        annotated_image = image.copy() if copy else image
         self.mp_drawing.draw_landmarks(
             annotated_image,
             results.pose_landmarks,
             self.mp_pose.POSE_CONNECTIONS,
-            landmark_drawing_spec=self.mp_drawing_styles.get_default_pose_landmarks_style()
+            landmark_drawing_spec=self.landmark_style
         )
         return annotated_image
 
+def resize_for_inference(image: np.ndarray, max_side: int) -> np.ndarray:
+    """
+    Downscale an image so its longest side is at most max_side, keeping the aspect ratio.
+    
+    Pose landmarks are normalized to the image size, so landmarks detected on the
+    smaller image can be drawn and measured on the original frame unchanged.
+    """
+    height, width = image.shape[:2]
+    scale = max_side / max(height, width)
+    if scale >= 1.0:
+        return image
+    return cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+
+class TextOverlayCache:
+    """
+    Draws lines of text by stamping pixels rasterized once per distinct line.
+    
+    HUD text such as a rep counter changes rarely, so instead of running cv2.putText on
+    every frame the drawn pixels of each line are kept and copied straight into later
+    frames. The result is identical to calling putText for each line in order.
+    """
+    
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        # (text, origin, scale, color, thickness) -> (rows, cols, colors) of the drawn pixels
+        self._layers = OrderedDict()
+        # Frames may be drawn from several threads, e.g. the video writer and the caller
+        self._lock = threading.Lock()
+    
+    def draw(self, image: np.ndarray, lines: Sequence[Tuple[str, Tuple[int, int], float, Tuple[int, int, int], int]]) -> np.ndarray:
+        """Draw each (text, origin, font scale, color, thickness) line onto image in place"""
+        height, width = image.shape[:2]
+        for line in lines:
+            rows, cols, colors = self._layer(line)
+            if rows.size and (rows[-1] >= height or cols.max() >= width):
+                inside = (rows < height) & (cols < width)
+                rows, cols, colors = rows[inside], cols[inside], colors[inside]
+            image[rows, cols] = colors
+        return image
+    
+    def _layer(self, line: tuple) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Pixel coordinates and colors of one line, rasterized on first use"""
+        with self._lock:
+            layer = self._layers.get(line)
+            if layer is not None:
+                self._layers.move_to_end(line)
+                return layer
+        
+        # Rasterize onto a blank canvas just big enough for the text, then keep only the drawn pixels
+        text, (x, y), scale, color, thickness = line
+        (text_width, _), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+        canvas = np.zeros((max(1, y + baseline + thickness + 1), max(1, x + text_width + thickness + 1), 3), dtype=np.uint8)
+        cv2.putText(canvas, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, scale, color, thickness)
+        rows, cols = np.nonzero(canvas.any(axis=2))
+        layer = (rows, cols, canvas[rows, cols])
+        
+        with self._lock:
+            self._layers[line] = layer
+            if len(self._layers) > self.max_entries:
+                self._layers.popitem(last=False)
+        return layer
+
 def calculate_angle(a: List[float], b: List[float], c: List[float]) -> float:
     """
     Calculate the angle between three points.
@@ -64,25 +158,46 @@ def calculate_angle(a: List[float], b: List[float], c: List[float]) -> float:
         c: Third point [x, y, z]
     
     Returns:
-        Angle in degrees
+        Angle in degrees, or NaN when a side has zero length
+    """
+    # Vectors from the vertex, on x, y only; plain floats avoid building tiny arrays per call
+    ba_x, ba_y = float(a[0]) - float(b[0]), float(a[1]) - float(b[1])
+    bc_x, bc_y = float(c[0]) - float(b[0]), float(c[1]) - float(b[1])
+    
+    # atan2(|cross|, dot) needs no norms or clamping and stays accurate near 0 and 180 degrees
+    cross = abs(ba_x * bc_y - ba_y * bc_x)
+    dot = ba_x * bc_x + ba_y * bc_y
+    if cross == 0.0 and dot == 0.0:
+        # A zero-length side leaves the angle undefined, like calculate_3d_angle
+        return float('nan')
+    
+    return math.degrees(math.atan2(cross, dot))
+
+def calculate_angles(landmarks: np.ndarray, joints: np.ndarray) -> np.ndarray:
     """
-    # Convert to numpy arrays and extract x, y coordinates
-    a = np.array([float(a[0]), float(a[1])])
-    b = np.array([float(b[0]), float(b[1])])
-    c = np.array([float(c[0]), float(c[1])])
+    Calculate the 2D angle at several joints in one vectorized pass.
     
-    # Calculate vectors
-    ba = a - b
-    bc = c - b
+    Args:
+        landmarks: Landmarks of shape (33, 4) from PoseDetector.get_landmarks, or an equivalent list;
+            a stack of shape (T, 33, 4) computes every frame at once
+        joints: Integer array of shape (n, 3) of landmark indices, vertex in the middle
     
-    # Calculate angle using dot product
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    cosine_angle = np.clip(cosine_angle, -1.0, 1.0)  # Clamp to avoid numerical issues
+    Returns:
+        Array of n angles in degrees, or (T, n) for stacked landmarks, matching calculate_angle for each triplet
+        (NaN where a side has zero length)
+    """
+    # Gather the x, y of every triplet at once: shape (..., n, 3, 2). asarray is free for the
+    # contiguous arrays get_landmarks returns and still accepts plain lists of landmarks
+    points = np.asarray(landmarks)[..., joints, :2].astype(np.float64)
+    ba = points[..., 0, :] - points[..., 1, :]
+    bc = points[..., 2, :] - points[..., 1, :]
     
-    angle = np.arccos(cosine_angle)
-    angle = np.degrees(angle)
+    cross = ba[..., 0] * bc[..., 1] - ba[..., 1] * bc[..., 0]
+    dot = ba[..., 0] * bc[..., 0] + ba[..., 1] * bc[..., 1]
     
-    return float(angle)
+    angles = np.degrees(np.arctan2(np.abs(cross), dot))
+    angles[(cross == 0.0) & (dot == 0.0)] = np.nan
+    return angles
 
 def calculate_3d_angle(a: List[float], b: List[float], c: List[float]) -> float:
     """
@@ -96,24 +211,25 @@ def calculate_3d_angle(a: List[float], b: List[float], c: List[float]) -> float:
     Returns:
         Angle in degrees
     """
-    a = np.array(a)
-    b = np.array(b)
-    c = np.array(c)
-    
-    ba = a - b
-    bc = c - b
+    # Plain floats avoid building tiny arrays per call
+    ba_x, ba_y, ba_z = float(a[0]) - float(b[0]), float(a[1]) - float(b[1]), float(a[2]) - float(b[2])
+    bc_x, bc_y, bc_z = float(c[0]) - float(b[0]), float(c[1]) - float(b[1]), float(c[2]) - float(b[2])
     
-    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
-    angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
+    # atan2(|cross|, dot) stays accurate near 0 and 180 degrees, where acos of the normalized dot does not
+    cross = math.hypot(ba_y * bc_z - ba_z * bc_y, ba_z * bc_x - ba_x * bc_z, ba_x * bc_y - ba_y * bc_x)
+    dot = ba_x * bc_x + ba_y * bc_y + ba_z * bc_z
+    if cross == 0.0 and dot == 0.0:
+        # A zero-length side leaves the angle undefined
+        return float('nan')
     
-    return np.degrees(angle)
+    return math.degrees(math.atan2(cross, dot))
 
 def get_landmark_coordinates(landmarks, landmark_idx):
-    """Get coordinates for a specific landmark"""
+    """Get (x, y, z) coordinates for a specific landmark"""
     if landmarks is not None and landmark_idx < len(landmarks):
         landmark = landmarks[landmark_idx]
         if len(landmark) >= 3:
-            return [float(landmark[0]), float(landmark[1]), float(landmark[2])]
+            return (float(landmark[0]), float(landmark[1]), float(landmark[2]))
     return None
 
 def is_landmark_visible(landmarks, landmark_idx, threshold=0.5):
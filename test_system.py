@@ -140,6 +140,149 @@ def test_angle_calculation():
         print(f"❌ Angle calculation test failed: {e}")
         return False
 
+def test_vectorized_angle_calculation():
+    """Test that the vectorized joint angles match the single-angle calculation"""
+    print("\n🧪 Testing vectorized angle calculations...")
+    
+    try:
+        from pose_utils import calculate_angle, calculate_angles
+        import numpy as np
+        
+        landmarks = np.random.default_rng(0).random((33, 4)).astype(np.float32)
+        joints = np.array([(12, 14, 16), (14, 12, 24), (24, 26, 28)])
+        
+        angles = calculate_angles(landmarks, joints)
+        expected = [calculate_angle(landmarks[a], landmarks[b], landmarks[c]) for a, b, c in joints]
+        
+        if np.allclose(angles, expected):
+            print(f"✅ Vectorized angles match: {np.round(angles, 1).tolist()}")
+            return True
+        else:
+            print(f"❌ Vectorized angles {angles.tolist()} differ from {expected}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Vectorized angle calculation test failed: {e}")
+        return False
+
+def test_sequence_analysis():
+    """Test that whole-sequence analysis matches frame-by-frame rep counting"""
+    print("\n🧪 Testing sequence analysis...")
+    
+    try:
+        from exercise_analyzer import create_analyzer
+        import numpy as np
+        
+        landmarks_sequence = np.random.default_rng(0).random((300, 33, 4)).astype(np.float32)
+        
+        frame_analyzer = create_analyzer("push-ups")
+        for landmarks in landmarks_sequence:
+            frame_result = frame_analyzer.analyze_frame(landmarks)
+        
+        sequence_result = create_analyzer("push-ups").analyze_sequence(landmarks_sequence)
+        
+        if sequence_result["rep_count"] == frame_result["rep_count"]:
+            print(f"✅ Sequence rep count matches: {sequence_result['rep_count']}")
+            return True
+        else:
+            print(f"❌ Sequence rep count {sequence_result['rep_count']} differs from {frame_result['rep_count']}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Sequence analysis test failed: {e}")
+        return False
+
+def test_degenerate_angles():
+    """Test that a zero-length side gives NaN angles and never counts a phantom rep"""
+    print("\n🧪 Testing degenerate angles...")
+    
+    try:
+        from pose_utils import PoseLandmarks, calculate_angle, calculate_angles, calculate_3d_angle
+        from exercise_analyzer import create_analyzer
+        import numpy as np
+        
+        point = [0.5, 0.5, 0.0]
+        single = [calculate_angle(point, point, [1, 1, 0]), calculate_3d_angle(point, point, [1, 1, 0])]
+        vectorized = calculate_angles(np.array([point + [1.0]] * 3), np.array([(0, 1, 2)]))
+        if not (np.isnan(single).all() and np.isnan(vectorized).all()):
+            print(f"❌ Degenerate angles should be NaN, got {single} and {vectorized.tolist()}")
+            return False
+        
+        # A straight, fully visible arm whose shoulder, elbow and wrist collapse onto one point mid-sequence
+        landmarks_sequence = np.ones((20, 33, 4), dtype=np.float32)
+        landmarks_sequence[:, PoseLandmarks.RIGHT_SHOULDER, :2] = (0.5, 0.2)
+        landmarks_sequence[:, PoseLandmarks.RIGHT_ELBOW, :2] = (0.5, 0.4)
+        landmarks_sequence[:, PoseLandmarks.RIGHT_WRIST, :2] = (0.5, 0.6)
+        for joint in (PoseLandmarks.RIGHT_SHOULDER, PoseLandmarks.RIGHT_WRIST):
+            landmarks_sequence[8:12, joint, :2] = (0.5, 0.4)
+        
+        frame_analyzer = create_analyzer("push-ups")
+        for landmarks in landmarks_sequence:
+            frame_result = frame_analyzer.analyze_frame(landmarks)
+        sequence_result = create_analyzer("push-ups").analyze_sequence(landmarks_sequence)
+        
+        if frame_result["rep_count"] == 0 and sequence_result["rep_count"] == 0:
+            print("✅ Degenerate angles are NaN and count no reps")
+            return True
+        else:
+            print(f"❌ Degenerate frames counted reps: {frame_result['rep_count']} frame-by-frame, "
+                  f"{sequence_result['rep_count']} for the sequence")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Degenerate angle test failed: {e}")
+        return False
+
+def test_writer_error_propagation():
+    """Test that a failure on the video writer thread is raised to the caller instead of hanging"""
+    print("\n🧪 Testing video writer error propagation...")
+    
+    try:
+        from video_processor import AsyncVideoWriter
+        import numpy as np
+        import os
+        import tempfile
+        import threading
+        
+        def failing_annotate(frame, result):
+            raise RuntimeError("annotation failed")
+        
+        outcome = {}
+        
+        def write_frames(output_path):
+            writer = AsyncVideoWriter(output_path, 30, (64, 64), queue_size=2, annotate=failing_annotate)
+            try:
+                # Far more frames than the queue holds, so a dead writer thread would block put()
+                for _ in range(20):
+                    writer.write(np.zeros((64, 64, 3), dtype=np.uint8), {})
+            except RuntimeError as e:
+                outcome["error"] = e
+            finally:
+                try:
+                    writer.release()
+                except RuntimeError as e:
+                    outcome.setdefault("error", e)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            thread = threading.Thread(target=write_frames, args=(os.path.join(tmp_dir, "out.mp4"),), daemon=True)
+            thread.start()
+            thread.join(timeout=10)
+            
+            if thread.is_alive():
+                print("❌ Video writer hung after an annotation failure")
+                return False
+        
+        if str(outcome.get("error")) == "annotation failed":
+            print("✅ Writer thread error raised to the caller")
+            return True
+        else:
+            print(f"❌ Expected the annotation error, got {outcome.get('error')!r}")
+            return False
+            
+    except Exception as e:
+        print(f"❌ Video writer error propagation test failed: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🚀 AI Fitness Tracker System Test")
@@ -152,6 +295,10 @@ def main():
         ("Exercise Analyzers", test_exercise_analyzers),
         ("Video Processor", test_video_processor),
         ("Angle Calculations", test_angle_calculation),
+        ("Vectorized Angle Calculations", test_vectorized_angle_calculation),
+        ("Sequence Analysis", test_sequence_analysis),
+        ("Degenerate Angles", test_degenerate_angles),
+        ("Writer Error Propagation", test_writer_error_propagation),
     ]
     
     passed = 0
@@ -2,9 +2,230 @@ import cv2
 import numpy as np
 import tempfile
 import os
-from typing import List, Dict, Tuple, Optional
-from pose_utils import PoseDetector
-from exercise_analyzer import ExerciseAnalyzer, FormFeedback
+import functools
+import math
+import itertools
+import multiprocessing
+import shutil
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Callable, List, Dict, Tuple, Optional, Union
+from pose_utils import PoseDetector, TextOverlayCache, resize_for_inference
+from exercise_analyzer import ExerciseAnalyzer, ExerciseState
+
+# Number of annotated frames kept in memory for the results preview
+PREVIEW_FRAME_COUNT = 6
+# Bytes copied per chunk when spooling an upload to disk
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+# Frames decoded ahead of pose analysis by the reader thread
+PREFETCH_FRAMES = 8
+# Consecutive analyzed frames sent to one pose worker as a single task by process_video_parallel
+PARALLEL_CHUNK_SIZE = 30
+# Minimum seconds between progress reports from process_video
+PROGRESS_INTERVAL = 0.5
+# Longest side, in pixels, of the frame handed to the pose model; accuracy saturates well below 1080p
+INFERENCE_MAX_SIDE = 480
+
+# Writer codecs in order of preference: H.264, then MPEG-4
+VIDEO_CODECS = ('avc1', 'mp4v')
+# First codec that opened; tried first afterwards, since builds without H.264 log FFmpeg errors on every failed attempt
+_working_codec = None
+
+def open_video_writer(output_path: str, fps: float, frame_size: Tuple[int, int]) -> cv2.VideoWriter:
+    """Open a video writer, preferring H.264 and falling back to MPEG-4"""
+    global _working_codec
+    # Use a hardware encoder when FFmpeg has one for the codec, otherwise it silently stays in software.
+    # A specific encoder can be forced through FFmpeg, e.g. OPENCV_FFMPEG_WRITER_OPTIONS="video_codec;h264_nvenc"
+    params = [cv2.VIDEOWRITER_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+    codecs = VIDEO_CODECS
+    if _working_codec:
+        codecs = (_working_codec,) + tuple(codec for codec in VIDEO_CODECS if codec != _working_codec)
+    for codec in codecs:
+        video_writer = cv2.VideoWriter(output_path, cv2.CAP_FFMPEG, cv2.VideoWriter_fourcc(*codec), fps, frame_size, params)
+        if video_writer.isOpened():
+            _working_codec = codec
+            return video_writer
+        video_writer.release()
+    raise ValueError(f"Could not open video writer for: {output_path}")
+
+def open_video_capture(video_path: str) -> cv2.VideoCapture:
+    """Open a video file or stream for reading with minimal driver-side buffering"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video file: {video_path}")
+    # Cameras and network streams otherwise queue several frames ahead of the reader; file
+    # backends ignore the setting, so a refusal is not an error
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+class AsyncVideoWriter:
+    """Encodes frames on a background thread so the caller never waits on the encoder"""
+    
+    def __init__(self, output_path: str, fps: float, frame_size: Tuple[int, int], queue_size: int = 32,
+                 annotate: Optional[Callable[[np.ndarray, Dict], np.ndarray]] = None):
+        self.video_writer = open_video_writer(output_path, fps, frame_size)
+        # Draws frames queued with a result on the writer thread, overlapping annotation with analysis
+        self.annotate = annotate
+        # Bounded so a slow encoder applies backpressure instead of buffering every frame
+        self.frame_queue = queue.Queue(maxsize=queue_size)
+        # First exception raised on the writer thread, re-raised to the caller by write() or release()
+        self.error = None
+        self._error_raised = False
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
+    
+    def _writer_loop(self):
+        """Background thread that drains queued frames into the video writer"""
+        try:
+            while True:
+                item = self.frame_queue.get()
+                if item is None:
+                    break
+                if self.error is not None:
+                    # Keep draining after a failure so the caller never blocks on a full queue
+                    continue
+                try:
+                    frame, result = item
+                    if result is not None:
+                        frame = self.annotate(frame, result)
+                    self.video_writer.write(frame)
+                except Exception as e:
+                    self.error = e
+        finally:
+            self.video_writer.release()
+    
+    def _raise_error(self):
+        """Re-raise, once, an exception the writer thread hit"""
+        if self.error is not None and not self._error_raised:
+            self._error_raised = True
+            raise self.error
+    
+    def write(self, frame: np.ndarray, result: Optional[Dict] = None):
+        """Queue a frame for encoding, annotating it with result on the writer thread when given"""
+        self._raise_error()
+        self.frame_queue.put((frame, result))
+    
+    def release(self):
+        """Flush queued frames and close the output file, raising any error from the writer thread"""
+        self.frame_queue.put(None)
+        self.writer_thread.join()
+        self._raise_error()
+
+@functools.lru_cache(maxsize=32)
+def preview_frame_indices(num_frames: int, count: int) -> Tuple[int, ...]:
+    """Evenly spaced frame indices, first to last, to keep for the results preview"""
+    if num_frames <= 0 or count <= 0:
+        return ()
+    return tuple(np.linspace(0, num_frames - 1, min(count, num_frames), dtype=np.int64).tolist())
+
+# Each pose worker process builds its own detector; MediaPipe graphs cannot be shared across processes
+_worker_pose_detector = None
+
+def _init_pose_worker():
+    """Create the pose detector for this worker process"""
+    global _worker_pose_detector
+    _worker_pose_detector = PoseDetector()
+
+def _detect_landmarks_chunk(frames: List[np.ndarray]) -> List[Optional[np.ndarray]]:
+    """Detect pose landmarks for a run of consecutive frames in a worker process"""
+    # A worker's previous chunk came from elsewhere in the video, so tracking starts afresh
+    _worker_pose_detector.reset()
+    return [_worker_pose_detector.get_landmarks(_worker_pose_detector.detect_pose(frame)) for frame in frames]
+
+class FrameAnalysisBuffer:
+    """
+    Per-frame analysis results stored column-wise.
+    
+    Keeps one growable array per field (frame number, rep count, state, angles) instead
+    of a dict per frame, while indexing still returns the familiar
+    {"frame_number", "analysis"} dict, built on demand. Slicing returns a list
+    of those dicts, as it did when analysis_results was a plain list.
+    
+    The rebuilt "angles" dict leaves out angles stored as NaN (undefined or never
+    measured), so it can hold fewer entries than analyze_frame returned for that frame.
+    """
+    
+    def __init__(self, capacity: int = 0):
+        capacity = max(capacity, 1)
+        self._size = 0
+        self._frame_numbers = np.empty(capacity, dtype=np.int32)
+        self._rep_counts = np.empty(capacity, dtype=np.int32)
+        self._states = np.empty(capacity, dtype=np.int8)
+        # (frames, angles) in angle_names order, NaN for frames without a detected pose
+        self.angle_names = ()
+        self._angles = np.empty((capacity, 0))
+        # Feedback lists hold shared FormFeedback instances, so a tuple per frame is all it costs
+        self.feedback = []
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._size))]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("frame analysis index out of range")
+        angles = self._angles[index]
+        return {
+            "frame_number": int(self._frame_numbers[index]),
+            "analysis": {
+                "rep_count": int(self._rep_counts[index]),
+                "state": ExerciseState(int(self._states[index])),
+                "angles": {name: float(angle) for name, angle in zip(self.angle_names, angles) if not np.isnan(angle)},
+                "feedback": list(self.feedback[index]),
+            },
+        }
+    
+    def __iter__(self):
+        return (self[i] for i in range(self._size))
+    
+    @property
+    def frame_numbers(self) -> np.ndarray:
+        return self._frame_numbers[:self._size]
+    
+    @property
+    def rep_counts(self) -> np.ndarray:
+        return self._rep_counts[:self._size]
+    
+    @property
+    def states(self) -> np.ndarray:
+        return self._states[:self._size]
+    
+    @property
+    def angles(self) -> np.ndarray:
+        return self._angles[:self._size]
+    
+    def append(self, frame_number: int, analysis: Dict):
+        """Add one frame's analysis, growing the arrays as needed"""
+        if self._size == len(self._frame_numbers):
+            # The container's frame count is only a hint, so grow geometrically past it
+            self._grow(2 * self._size)
+        
+        angles = analysis["angles"]
+        if angles and not self.angle_names:
+            self.angle_names = tuple(angles)
+            self._angles = np.full((len(self._frame_numbers), len(self.angle_names)), np.nan)
+        
+        i = self._size
+        self._frame_numbers[i] = frame_number
+        self._rep_counts[i] = analysis["rep_count"]
+        self._states[i] = analysis["state"]
+        self._angles[i] = [angles.get(name, np.nan) for name in self.angle_names]
+        self.feedback.append(tuple(analysis.get("feedback", ())))
+        self._size += 1
+    
+    def _grow(self, capacity: int):
+        """Reallocate every column with room for capacity frames"""
+        self._frame_numbers = np.resize(self._frame_numbers, capacity)
+        self._rep_counts = np.resize(self._rep_counts, capacity)
+        self._states = np.resize(self._states, capacity)
+        angles = np.full((capacity, len(self.angle_names)), np.nan)
+        angles[:self._size] = self._angles[:self._size]
+        self._angles = angles
 
 class VideoProcessor:
     """Handles video processing and analysis"""
@@ -13,7 +234,15 @@ class VideoProcessor:
         self.pose_detector = PoseDetector()
         self.analyzer = None
         self.processed_frames = []
-        self.analysis_results = []
+        self.analysis_results = FrameAnalysisBuffer()
+        # Running summary counts, updated as each frame's analysis is recorded
+        self.correct_form_frames = 0
+        self.feedback_counts = Counter()
+        # Annotated video written by the last process_video call, if any, and the source frame rate
+        self.output_path = None
+        self.video_fps = 0
+        # Overlay text is rasterized once per distinct line and stamped onto later frames
+        self._hud = TextOverlayCache()
         
     def set_exercise_analyzer(self, analyzer: ExerciseAnalyzer):
         """Set the exercise analyzer for the current video"""
@@ -21,13 +250,26 @@ class VideoProcessor:
         if self.analyzer:
             self.analyzer.reset()
     
-    def process_video(self, video_path: str, output_path: Optional[str] = None) -> Dict:
+    def process_video(self, video_path: str, output_path: Optional[str] = None,
+                      keep_frames: bool = False, preview_count: int = 0,
+                      prefetch: int = PREFETCH_FRAMES, analysis_stride: int = 1,
+                      progress_callback: Optional[Callable[[float], None]] = None) -> Dict:
         """
         Process a video file and return analysis results
         
         Args:
             video_path: Path to input video file
             output_path: Optional path for processed video output
+            keep_frames: Keep every annotated frame in memory as processed_frames; off by default
+                since it costs width x height x 3 bytes per frame, and save_processed_video can
+                re-read output_path instead
+            preview_count: Number of evenly spaced annotated frames to return as preview_frames,
+                a (N, H, W, 3) array whose frame numbers are in preview_indices
+            prefetch: Frames decoded ahead on a background reader thread (0 decodes inline)
+            analysis_stride: Run pose analysis on every Nth frame; frames in between
+                reuse the last analysis but are still annotated and written
+            progress_callback: Called at most every PROGRESS_INTERVAL seconds with the completed
+                fraction (0-1); progress is printed when omitted
             
         Returns:
             Dictionary containing analysis results
@@ -36,12 +278,11 @@ class VideoProcessor:
             raise ValueError("Exercise analyzer not set. Call set_exercise_analyzer() first.")
         
         # Open video file
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise ValueError(f"Could not open video file: {video_path}")
+        cap = open_video_capture(video_path)
         
         # Get video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        # Variable frame rate or missing metadata reports 0, and rates below 1 truncate to it
+        fps = max(int(cap.get(cv2.CAP_PROP_FPS)), 0)
         frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
         frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
@@ -49,39 +290,70 @@ class VideoProcessor:
         # Initialize video writer if output path is provided
         video_writer = None
         if output_path:
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            video_writer = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+            # A writer does not open at 0 FPS, so fall back like save_processed_video
+            video_writer = AsyncVideoWriter(output_path, fps or 30, (frame_width, frame_height),
+                                            annotate=self._draw_analysis_on_frame)
         
+        analysis_stride = max(1, analysis_stride)
         frame_count = 0
         self.processed_frames = []
-        self.analysis_results = []
+        self.analysis_results = FrameAnalysisBuffer(total_frames)
+        self.correct_form_frames = 0
+        self.feedback_counts = Counter()
+        self.output_path = output_path
+        self.video_fps = fps
+        # Preview frames share one contiguous block rather than a list of separate arrays;
+        # it is sized from the first decoded frame, which may differ from the reported size
+        preview_indices = preview_frame_indices(total_frames, preview_count)
+        preview_frames = np.empty((0, frame_height, frame_width, 3), dtype=np.uint8)
+        preview_filled = 0
+        
+        # Decoding, pose inference and annotation plus encoding run as a three-stage pipeline:
+        # the reader thread decodes ahead, this thread analyzes, the writer thread draws and encodes
+        frames = self._iter_frames(cap, prefetch)
         
+        result = None
+        next_progress_at = time.monotonic() + PROGRESS_INTERVAL
         try:
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
+            for frame in frames:
+                # Process frame, reusing the last analysis between sampled frames
+                if result is None or frame_count % analysis_stride == 0:
+                    result = self._process_frame(frame, frame_count)
+                else:
+                    result = dict(result, frame_number=frame_count)
+                # Pose results and landmarks are only needed to draw this frame, so they are not retained
+                self._record_analysis(frame_count, result["analysis"])
                 
-                # Process frame
-                result = self._process_frame(frame, frame_count)
-                self.analysis_results.append(result)
-                
-                # Draw analysis on frame
-                annotated_frame = self._draw_analysis_on_frame(frame, result)
-                self.processed_frames.append(annotated_frame)
-                
-                # Write to output video if specified
-                if video_writer:
-                    video_writer.write(annotated_frame)
+                is_preview = preview_filled < len(preview_indices) and frame_count == preview_indices[preview_filled]
+                if keep_frames or is_preview:
+                    # Frames kept here are drawn on this thread and written as they are
+                    annotated_frame = self._draw_analysis_on_frame(frame, result)
+                    if keep_frames:
+                        self.processed_frames.append(annotated_frame)
+                    if is_preview:
+                        if preview_filled == 0:
+                            preview_frames = np.empty((len(preview_indices),) + annotated_frame.shape, dtype=np.uint8)
+                        np.copyto(preview_frames[preview_filled], annotated_frame)
+                        preview_filled += 1
+                    if video_writer:
+                        video_writer.write(annotated_frame)
+                elif video_writer:
+                    # Everything else is drawn on the writer thread while the next frame is analyzed
+                    video_writer.write(frame, result)
                 
                 frame_count += 1
                 
-                # Progress update every 30 frames
-                if frame_count % 30 == 0:
-                    progress = (frame_count / total_frames) * 100
-                    print(f"Processing: {progress:.1f}% complete")
+                # Progress update at most every PROGRESS_INTERVAL seconds, however fast frames go by
+                if total_frames > 0 and time.monotonic() >= next_progress_at:
+                    next_progress_at = time.monotonic() + PROGRESS_INTERVAL
+                    progress = min(frame_count / total_frames, 1.0)
+                    if progress_callback:
+                        progress_callback(progress)
+                    else:
+                        print(f"Processing: {progress * 100:.1f}% complete")
         
         finally:
+            frames.close()
             cap.release()
             if video_writer:
                 video_writer.release()
@@ -93,6 +365,10 @@ class VideoProcessor:
             "summary": summary,
             "frame_results": self.analysis_results,
             "processed_frames": self.processed_frames,
+            "output_path": output_path,
+            # The container's frame count can overestimate, so drop unfilled slots
+            "preview_frames": preview_frames[:preview_filled],
+            "preview_indices": preview_indices[:preview_filled],
             "video_info": {
                 "fps": fps,
                 "frame_count": frame_count,
@@ -101,17 +377,152 @@ class VideoProcessor:
             }
         }
     
+    def process_video_parallel(self, video_path: str, num_workers: Optional[int] = None,
+                               prefetch: int = PREFETCH_FRAMES, analysis_stride: int = 1,
+                               progress_callback: Optional[Callable[[float], None]] = None) -> Dict:
+        """
+        Analyze a video with pose detection spread over worker processes
+        
+        Frames are decoded here and sent to a pool of processes in runs of PARALLEL_CHUNK_SIZE
+        consecutive analyzed frames; the exercise analyzer then runs over the landmarks in frame
+        order, so results are deterministic for a given chunk size. Each chunk starts pose
+        tracking afresh, so landmarks near chunk boundaries, and occasionally the rep count,
+        can differ slightly from process_video, which tracks through the whole video. No
+        annotated output is produced.
+        
+        Args:
+            video_path: Path to input video file
+            num_workers: Pose worker processes (defaults to the CPU count)
+            prefetch: Frames decoded ahead on a background reader thread (0 decodes inline)
+            analysis_stride: Run pose analysis on every Nth frame; frames in between
+                reuse the last analysis, as in process_video
+            progress_callback: Called after each batch with the completed fraction (0-1);
+                progress is printed when omitted
+            
+        Returns:
+            Dictionary with summary, frame_results and video_info
+        """
+        if not self.analyzer:
+            raise ValueError("Exercise analyzer not set. Call set_exercise_analyzer() first.")
+        
+        cap = open_video_capture(video_path)
+        
+        # Variable frame rate or missing metadata reports 0, and rates below 1 truncate to it
+        fps = max(int(cap.get(cv2.CAP_PROP_FPS)), 0)
+        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        num_workers = num_workers or os.cpu_count() or 1
+        analysis_stride = max(1, analysis_stride)
+        frame_count = 0
+        self.processed_frames = []
+        self.analysis_results = FrameAnalysisBuffer(total_frames)
+        self.correct_form_frames = 0
+        self.feedback_counts = Counter()
+        self.output_path = None
+        self.video_fps = fps
+        
+        frames = self._iter_frames(cap, prefetch)
+        # Spawned rather than forked: MediaPipe and OpenCV threads do not survive a fork
+        pool = multiprocessing.get_context("spawn").Pool(num_workers, initializer=_init_pose_worker)
+        try:
+            analysis = None
+            while True:
+                # Bounded batches keep only a few chunks of decoded frames in flight; only the frames
+                # to analyze are kept, downscaled before pickling to cut what is copied to the workers
+                batch = []
+                batch_frames = 0
+                for frame in itertools.islice(frames, num_workers * PARALLEL_CHUNK_SIZE * analysis_stride):
+                    if (frame_count + batch_frames) % analysis_stride == 0:
+                        batch.append(resize_for_inference(frame, INFERENCE_MAX_SIDE))
+                    batch_frames += 1
+                if not batch_frames:
+                    break
+                
+                # One task per chunk, so each worker tracks through consecutive frames only
+                chunks = [batch[i:i + PARALLEL_CHUNK_SIZE] for i in range(0, len(batch), PARALLEL_CHUNK_SIZE)]
+                detected = itertools.chain.from_iterable(pool.map(_detect_landmarks_chunk, chunks, chunksize=1))
+                for _ in range(batch_frames):
+                    # Frames between analyzed ones reuse the last analysis
+                    if frame_count % analysis_stride == 0:
+                        analysis = self.analyzer.analyze_frame(next(detected))
+                    self._record_analysis(frame_count, analysis)
+                    frame_count += 1
+                
+                if total_frames > 0:
+                    progress = min(frame_count / total_frames, 1.0)
+                    if progress_callback:
+                        progress_callback(progress)
+                    else:
+                        print(f"Processing: {progress * 100:.1f}% complete")
+        
+        finally:
+            pool.terminate()
+            pool.join()
+            frames.close()
+            cap.release()
+        
+        return {
+            "summary": self._generate_summary(),
+            "frame_results": self.analysis_results,
+            "video_info": {
+                "fps": fps,
+                "frame_count": frame_count,
+                "duration": frame_count / fps if fps > 0 else 0,
+                "resolution": (frame_width, frame_height)
+            }
+        }
+    
+    def _iter_frames(self, cap: cv2.VideoCapture, prefetch: int):
+        """Yield decoded frames, decoding up to prefetch frames ahead on a background thread"""
+        if prefetch <= 0:
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                yield frame
+        
+        frame_queue = queue.Queue(maxsize=prefetch)
+        stop_event = threading.Event()
+        reader_thread = threading.Thread(target=self._read_frames, args=(cap, frame_queue, stop_event), daemon=True)
+        reader_thread.start()
+        
+        try:
+            while True:
+                frame = frame_queue.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            # Stop the reader and drain the queue so it is never left blocked on a full queue
+            stop_event.set()
+            while reader_thread.is_alive():
+                try:
+                    frame_queue.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+    
+    def _read_frames(self, cap: cv2.VideoCapture, frame_queue: queue.Queue, stop_event: threading.Event):
+        """Background thread that decodes frames into frame_queue, ending with None"""
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_queue.put(frame)
+        frame_queue.put(None)
+    
     def _process_frame(self, frame: np.ndarray, frame_number: int) -> Dict:
         """Process a single frame and return analysis results"""
-        # Detect pose
-        pose_results = self.pose_detector.detect_pose(frame)
+        # Detect pose on a downscaled copy; landmarks are normalized, so they draw on the full frame unchanged
+        pose_results = self.pose_detector.detect_pose(resize_for_inference(frame, INFERENCE_MAX_SIDE))
         landmarks = self.pose_detector.get_landmarks(pose_results)
         
         # Analyze exercise
         if self.analyzer:
             analysis = self.analyzer.analyze_frame(landmarks)
         else:
-            analysis = {"rep_count": 0, "state": "unknown", "angles": {}, "feedback": []}
+            analysis = {"rep_count": 0, "state": ExerciseState.UNKNOWN, "angles": {}, "feedback": []}
         
         return {
             "frame_number": frame_number,
@@ -121,117 +532,148 @@ class VideoProcessor:
         }
     
     def _draw_analysis_on_frame(self, frame: np.ndarray, result: Dict) -> np.ndarray:
-        """Draw analysis results on frame"""
-        annotated_frame = frame.copy()
+        """Draw analysis results directly onto frame, which callers no longer need unannotated"""
+        annotated_frame = frame
         
         # Draw pose landmarks
         if result["pose_results"]:
-            annotated_frame = self.pose_detector.draw_pose(annotated_frame, result["pose_results"])
-        
-        # Draw analysis information
-        analysis = result["analysis"]
-        
-        # Rep counter
-        rep_text = f"Reps: {analysis['rep_count']}"
-        cv2.putText(annotated_frame, rep_text, (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-        
-        # Current state
-        state_text = f"State: {analysis['state'].upper()}"
-        cv2.putText(annotated_frame, state_text, (10, 70), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-        
-        # Draw angles
-        y_offset = 110
-        for angle_name, angle_value in analysis['angles'].items():
-            angle_text = f"{angle_name}: {angle_value:.1f}°"
-            cv2.putText(annotated_frame, angle_text, (10, y_offset), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-            y_offset += 30
-        
-        # Draw feedback
-        feedback_y = frame.shape[0] - 100
-        for i, feedback in enumerate(analysis['feedback']):
-            if isinstance(feedback, FormFeedback):
-                color = (0, 255, 0) if feedback.is_correct else (0, 0, 255)
-                cv2.putText(annotated_frame, feedback.message, (10, feedback_y + i * 25), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+            self.pose_detector.draw_pose(annotated_frame, result["pose_results"], copy=False)
+        
+        # Draw analysis information from cached text pixels rather than rasterizing it every frame
+        self._hud.draw(annotated_frame, self._hud_lines(result["analysis"], frame.shape[0]))
         
         return annotated_frame
     
+    def _hud_lines(self, analysis: Dict, frame_height: int) -> List[Tuple[str, Tuple[int, int], float, Tuple[int, int, int], int]]:
+        """(text, origin, font scale, color, thickness) for the rep counter, state, angles and feedback"""
+        lines = [
+            (f"Reps: {analysis['rep_count']}", (10, 30), 1, (0, 255, 0), 2),
+            (f"State: {analysis['state'].name}", (10, 70), 0.7, (255, 255, 0), 2),
+        ]
+        # Undefined (NaN) angles are left out rather than drawn as "nan°"
+        measured = [(name, value) for name, value in analysis['angles'].items() if not math.isnan(value)]
+        for i, (angle_name, angle_value) in enumerate(measured):
+            lines.append((f"{angle_name}: {angle_value:.1f}°", (10, 110 + 30 * i), 0.6, (255, 255, 255), 2))
+        
+        # Feedback along the bottom of the frame
+        feedback_y = frame_height - 100
+        for i, feedback in enumerate(analysis['feedback']):
+            color = (0, 255, 0) if feedback.is_correct else (0, 0, 255)
+            lines.append((feedback.message, (10, feedback_y + i * 25), 0.5, color, 1))
+        return lines
+    
+    def _record_analysis(self, frame_number: int, analysis: Dict):
+        """Keep a frame's analysis and fold it into the running summary counts"""
+        self.analysis_results.append(frame_number, analysis)
+        feedback_list = analysis.get("feedback", [])
+        
+        # Count frames with correct form
+        if all(f.is_correct for f in feedback_list):
+            self.correct_form_frames += 1
+        
+        # Feedback messages are shared immutable instances, so they count directly
+        self.feedback_counts.update(feedback_list)
+    
     def _generate_summary(self) -> Dict:
-        """Generate summary of analysis results"""
+        """Generate summary of analysis results from the counts gathered while processing"""
         if not self.analysis_results:
             return {"total_reps": 0, "form_accuracy": 0, "feedback_summary": []}
         
         # Get final rep count
-        final_analysis = self.analysis_results[-1]["analysis"]
-        total_reps = final_analysis["rep_count"]
+        total_reps = int(self.analysis_results.rep_counts[-1])
         
-        # Calculate form accuracy
         total_frames = len(self.analysis_results)
-        correct_form_frames = 0
-        feedback_summary = {}
+        form_accuracy = (self.correct_form_frames / total_frames) * 100
         
-        for result in self.analysis_results:
-            analysis = result["analysis"]
-            feedback_list = analysis.get("feedback", [])
-            
-            # Count frames with correct form
-            if not feedback_list or all(f.is_correct for f in feedback_list):
-                correct_form_frames += 1
-            
-            # Aggregate feedback
-            for feedback in feedback_list:
-                if isinstance(feedback, FormFeedback):
-                    if feedback.message not in feedback_summary:
-                        feedback_summary[feedback.message] = {
-                            "count": 0,
-                            "severity": feedback.severity
-                        }
-                    feedback_summary[feedback.message]["count"] += 1
-        
-        form_accuracy = (correct_form_frames / total_frames) * 100 if total_frames > 0 else 0
+        # Counted per FormFeedback but summarized per message, keeping the first severity seen for it
+        feedback_summary = {}
+        for feedback, count in self.feedback_counts.items():
+            entry = feedback_summary.setdefault(feedback.message, {"count": 0, "severity": feedback.severity})
+            entry["count"] += count
         
         return {
             "total_reps": total_reps,
             "form_accuracy": form_accuracy,
             "total_frames": total_frames,
-            "correct_form_frames": correct_form_frames,
+            "correct_form_frames": self.correct_form_frames,
             "feedback_summary": feedback_summary
         }
     
-    def save_processed_video(self, output_path: str) -> bool:
-        """Save processed frames as video"""
-        if not self.processed_frames:
-            return False
+    def save_processed_video(self, output_path: str, fps: Optional[float] = None) -> bool:
+        """
+        Save processed frames as video
         
-        height, width = self.processed_frames[0].shape[:2]
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        video_writer = cv2.VideoWriter(output_path, fourcc, 30, (width, height))
+        Kept frames are encoded at fps (default: the source frame rate, else 30). Otherwise the
+        video written by process_video is copied as is, or re-encoded when the container or
+        frame rate differs.
+        """
+        fps = fps or self.video_fps or 30
+        cap = None
+        if self.processed_frames:
+            frames = self.processed_frames
+        elif self.output_path and os.path.exists(self.output_path):
+            if os.path.abspath(output_path) == os.path.abspath(self.output_path):
+                return True
+            same_container = os.path.splitext(output_path)[1].lower() == os.path.splitext(self.output_path)[1].lower()
+            if same_container and fps == (self.video_fps or 30):
+                # Already encoded with these settings, so a byte copy replaces a full decode and encode
+                shutil.copyfile(self.output_path, output_path)
+                return True
+            cap = cv2.VideoCapture(self.output_path)
+            frames = self._iter_frames(cap, 0)
+        else:
+            return False
         
-        for frame in self.processed_frames:
-            video_writer.write(frame)
+        video_writer = None
+        try:
+            for frame in frames:
+                if video_writer is None:
+                    height, width = frame.shape[:2]
+                    video_writer = open_video_writer(output_path, fps, (width, height))
+                video_writer.write(frame)
+        finally:
+            if cap:
+                cap.release()
+            if video_writer:
+                video_writer.release()
         
-        video_writer.release()
-        return True
+        return video_writer is not None
 
-def process_uploaded_video(video_file, exercise_type: str) -> Dict:
+def process_uploaded_video(video_file, exercise_type: str, prefetch: int = PREFETCH_FRAMES,
+                           analysis_stride: int = 1,
+                           progress_callback: Optional[Callable[[float], None]] = None,
+                           output_dir: Optional[str] = None) -> Dict:
     """
     Process an uploaded video file
     
+    The annotated video is written to a temporary file while frames are
+    analyzed, so only a handful of preview frames are kept in memory. The
+    caller owns the file at video_path and should delete it when done, or
+    pass an output_dir whose cleanup it already manages.
+    
     Args:
         video_file: Uploaded file object (e.g., from Streamlit)
         exercise_type: Type of exercise to analyze
+        prefetch: Frames decoded ahead of analysis on a background thread
+        analysis_stride: Run pose analysis on every Nth frame
+        progress_callback: Called periodically with the completed fraction (0-1)
+        output_dir: Directory for the annotated video (defaults to the system temp directory)
         
     Returns:
-        Analysis results dictionary
+        Dictionary with video_path, preview_frames, preview_indices, summary and video_info
     """
-    # Save uploaded file to temporary location
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-        tmp_file.write(video_file.read())
+    # Save uploaded file to temporary location, copying in chunks rather than
+    # materializing a second in-memory copy of the whole upload
+    suffix = os.path.splitext(getattr(video_file, 'name', ''))[1] or '.mp4'
+    if hasattr(video_file, 'seek'):
+        video_file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp_file:
+        shutil.copyfileobj(video_file, tmp_file, UPLOAD_CHUNK_SIZE)
         temp_video_path = tmp_file.name
     
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4', dir=output_dir) as out_file:
+        output_video_path = out_file.name
+    
     try:
         # Create processor and analyzer
         processor = VideoProcessor()
@@ -239,12 +681,26 @@ def process_uploaded_video(video_file, exercise_type: str) -> Dict:
         analyzer = create_analyzer(exercise_type)
         processor.set_exercise_analyzer(analyzer)
         
-        # Process video
-        results = processor.process_video(temp_video_path)
+        # Process video, streaming annotated frames to disk
+        results = processor.process_video(temp_video_path, output_path=output_video_path,
+                                          keep_frames=False, preview_count=PREVIEW_FRAME_COUNT,
+                                          prefetch=prefetch, analysis_stride=analysis_stride,
+                                          progress_callback=progress_callback)
         
-        return results
+        return {
+            "video_path": output_video_path,
+            "preview_frames": results["preview_frames"],
+            "preview_indices": results["preview_indices"],
+            "summary": results["summary"],
+            "video_info": results["video_info"]
+        }
+    
+    except Exception:
+        if os.path.exists(output_video_path):
+            os.unlink(output_video_path)
+        raise
     
     finally:
         # Clean up temporary file
         if os.path.exists(temp_video_path):
-            os.unlink(temp_video_path) 
\ No newline at end of file
+            os.unlink(temp_video_path)